@@ -23,6 +23,10 @@ setuptools.setup(
         'scipy>=1.1.0',
         #'distributed>=1.25.2'
     ],
+    extras_require={
+        'numba': ['numba>=0.45.0'],
+        'cuda': ['cupy>=6.0.0'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -4,6 +4,7 @@ model can be created by calling one of these classes to create a model object.
 """
 
 import numpy as np
+import scipy.linalg as la
 from squidward.utils import Invert, exactly_1d, exactly_2d, check_valid_cov
 
 # TODO: Add tests for non-zero prior mean
@@ -204,7 +205,11 @@ class GaussianProcessBase(object):
             assert self.var_l.shape[0] == self.y_obs.shape[0], \
                 "The length of the likelihood variance array does not match the number of training observations."
 
-        K = self.kernel(x_obs, x_obs)
+        # let the kernel cache what it can about the training features
+        if hasattr(self.kernel, 'fit'):
+            self.kernel.fit(self.x_obs)
+
+        K = self.kernel(self.x_obs, self.x_obs)
 
         identity = np.zeros(K.shape)
         idx = np.diag_indices(identity.shape[0])
@@ -243,7 +248,7 @@ class GaussianProcessBase(object):
 class GaussianProcessInversion(GaussianProcessBase):
     """Model object for single output gaussian process (SOGP) regression."""
 
-    def __init__(self, inv_method="inv", *args, **kwargs):
+    def __init__(self, inv_method="inv", *args, dtype=None, **kwargs):
         """
         Description
         ----------
@@ -255,12 +260,15 @@ class GaussianProcessInversion(GaussianProcessBase):
         inv_method: string
             A string argument choosing an inversion method for matrix K when
             fitting the gaussian process.
+        dtype: numpy dtype
+            Optional dtype that K is cast to before inverting it. Defaults to
+            the dtype of K.
 
         Returns
         ----------
         Model object
         """
-        self.inv = Invert(inv_method)
+        self.inv = Invert(inv_method, dtype=dtype)
         GaussianProcessBase.__init__(self, *args, **kwargs)
 
     def fit(self, x_obs, y_obs):
@@ -286,6 +294,8 @@ class GaussianProcessInversion(GaussianProcessBase):
         """
         self.K = self._fit(x_obs, y_obs)
         self.inv_K = self.inv(self.K)
+        # K^-1 y does not depend on the test points, compute it once
+        self.alpha = self.inv_K.dot(self.y_obs)
         self.fitted = True
 
     def posterior_predict(self, x_test, return_cov=False):
@@ -324,7 +334,7 @@ class GaussianProcessInversion(GaussianProcessBase):
         K_s = self.kernel(x_test, self.x_obs)
         K_ss = self.kernel(x_test, x_test)
 
-        mean = K_s.dot(self.inv_K).dot(self.y_obs)
+        mean = K_s.dot(self.alpha)
         cov = K_ss - np.dot(np.dot(K_s, self.inv_K), K_s.T)
 
         if self.prior_mean is not None:
@@ -346,7 +356,7 @@ class GaussianProcessInversion(GaussianProcessBase):
 class GaussianProcessCholesky(GaussianProcessBase):
     """Model object for single output gaussian process (SOGP) regression formulated for stability.."""
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, dtype=None, **kwargs):
         """
         Description
         ----------
@@ -357,11 +367,16 @@ class GaussianProcessCholesky(GaussianProcessBase):
 
         Parameters
         ----------
+        dtype: numpy dtype
+            Optional dtype that K is cast to before factorizing it. With
+            np.float32 the factorization is retried in float64 if it fails.
+            Defaults to the dtype of K.
 
         Returns
         ----------
         Model object
         """
+        self.inv = Invert('cholesky', dtype=dtype)
         GaussianProcessBase.__init__(self, *args, **kwargs)
 
     def fit(self, x_obs, y_obs):
@@ -386,11 +401,14 @@ class GaussianProcessCholesky(GaussianProcessBase):
         None
         """
         K = self._fit(x_obs, y_obs)
+        if self.inv.dtype is not None:
+            K = K.astype(self.inv.dtype, copy=False)
 
         # More numerically stable
         # Gaussian Processes for Machine Learning Alg 2.1
-        self.L = np.linalg.cholesky(K)
-        self.alpha = np.linalg.solve(self.L.transpose(), np.linalg.solve(self.L, self.y_obs))
+        self._factor = self.inv.cho_factor(K)
+        self.L = np.tril(self._factor[0])
+        self.alpha = self.inv.cho_solve_rhs(self._factor, self.y_obs)
         self.fitted = True
 
     def posterior_predict(self, x_test, return_cov=False):
@@ -428,7 +446,7 @@ class GaussianProcessCholesky(GaussianProcessBase):
         # Gaussian Processes for Machine Learning Eq 2.18/2.19
         K_ = self.kernel(self.x_obs, x_test)
         K_ss = self.kernel(x_test, x_test)
-        V = np.linalg.solve(self.L, K_)
+        V = la.solve_triangular(self.L, K_, lower=True)
 
         mean = np.dot(K_.transpose(), self.alpha)
         cov = K_ss - np.dot(V.transpose(), V)
@@ -0,0 +1,40 @@
+"""
+Numba compiled helpers for the rbf gram matrix. Imported lazily by the
+numba backend of distance.RBF, so numba is only loaded when it is used.
+"""
+
+import math
+from numba import njit, prange
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def rbf_gram(alpha, beta, amp, var_k, out):
+    """
+    Fused rbf gram matrix. Computes each squared distance in a scalar
+    accumulator and writes the rbf value straight to out.
+    """
+    for i in prange(alpha.shape[0]):
+        for j in range(beta.shape[0]):
+            distance = 0.0
+            for k in range(alpha.shape[1]):
+                diff = alpha[i, k] - beta[j, k]
+                distance += diff*diff
+            out[i, j] = var_k*math.exp(amp*distance)
+    return out
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def rbf_gram_sym(alpha, amp, var_k, out):
+    """
+    Fused rbf gram matrix of an array against itself. Only the upper
+    triangle is computed and then mirrored, and the diagonal is var_k.
+    """
+    for i in prange(alpha.shape[0]):
+        out[i, i] = var_k
+        for j in range(i + 1, alpha.shape[0]):
+            distance = 0.0
+            for k in range(alpha.shape[1]):
+                diff = alpha[i, k] - alpha[j, k]
+                distance += diff*diff
+            out[i, j] = out[j, i] = var_k*math.exp(amp*distance)
+    return out
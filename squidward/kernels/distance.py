@@ -3,19 +3,82 @@ Distance functions to define how "far" apart two vectors are.
 """
 
 import numpy as np
-from squidward.utils import exactly_1d
+from squidward.utils import exactly_1d, exactly_2d, as_float, row_norms, squared_distances, NormCache
 
 np.seterr(over="raise")
 
+# cupy is optional and only needed for the cuda backend
+try:
+    import cupy
+except ImportError:
+    cupy = None
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Compiled Helpers
+# ---------------------------------------------------------------------------------------------------------------------
+
+
+def _compiled_helpers():
+    """
+    Imports the numba compiled helpers on first use, so importing this
+    module does not load numba. Returns None if numba is not installed.
+    """
+    try:
+        from squidward.kernels import _compiled
+    except ImportError:
+        return None
+    return _compiled
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Array Helpers
+# ---------------------------------------------------------------------------------------------------------------------
+
+
+def _rbf_tile(xp, alpha, beta, alpha_sq, beta_sq, amp, var_k, out):
+    """
+    Writes the rbf covariance between the rows of alpha and beta into out,
+    with every step done in place. alpha_sq and beta_sq are the squared
+    row norms and xp is the array module (numpy or cupy) the arrays belong
+    to, see utils.squared_distances.
+    """
+    squared_distances(alpha, beta, alpha_sq, beta_sq, out=out, xp=xp)
+    out *= amp
+    xp.exp(out, out=out)
+    out *= var_k
+    return out
+
 # ---------------------------------------------------------------------------------------------------------------------
 # Radial Basis Function
 # ---------------------------------------------------------------------------------------------------------------------
 
 
-class RBF(object):
+class LengthscaleMixin(object):
+    """Lengthscale handling shared by the rbf distance and the rbf kernel."""
+
+    @property
+    def lengthscale(self):
+        """
+        The lengthscale of the rbf function. Setting it checks the value and
+        recomputes the exponent scale -0.5/l^2 (self._amp) used by every
+        call, rather than computing it on each call.
+        """
+        return self._lengthscale
+
+    @lengthscale.setter
+    def lengthscale(self, lengthscale):
+        if lengthscale <= 0.0:
+            raise Exception("Lengthscale parameter must be greater than zero.")
+        self._lengthscale = lengthscale
+        self._amp = -0.5/(lengthscale*lengthscale)
+
+
+class RBF(LengthscaleMixin):
     """Class for radial basis fucntion distance measure."""
 
-    def __init__(self, lengthscale, var_k):
+    # rows / columns per tile when building large gram matrices with numpy
+    block_size = 256
+
+    def __init__(self, lengthscale, var_k, backend='cpu', dtype=None):
         """
         Description
         ----------
@@ -31,6 +94,19 @@ class RBF(object):
         var_k: Float
             The kernel variance or amplitude. This can be thought of as the maximum
             value that the rbf function can take.
+        backend: String
+            Where gram matrices are built. Options: cpu, numba, cuda. The cpu
+            backend does the work in a single BLAS matrix product and is the
+            fastest choice in most cases. The numba backend requires numba and
+            runs a compiled loop instead, which only tends to win for a handful
+            of features spread over many cores. The cuda backend requires cupy
+            and only pays off for large problems (n*m*d of roughly 1e7 or
+            more), below that host / device transfers dominate.
+        dtype: numpy dtype
+            Optional dtype that inputs are cast to before building gram
+            matrices. np.float32 halves memory traffic and is usually accurate
+            enough for prediction, though not always for fitting. Defaults to
+            the dtype of the inputs.
 
         Returns
         ----------
@@ -38,10 +114,18 @@ class RBF(object):
         """
         self.lengthscale = lengthscale
         self.var_k = var_k
-        if lengthscale <= 0.0:
-            raise Exception("Lengthscale parameter must be greater than zero.")
+        self.backend = backend
+        self.dtype = dtype
         if var_k <= 0.0:
             raise Exception("Kernel variance parameter must be greater than zero.")
+        if backend not in ('cpu', 'numba', 'cuda'):
+            raise Exception("Invalid argument for backend.")
+        if backend == 'numba' and _compiled_helpers() is None:
+            raise Exception("The numba backend requires numba to be installed.")
+        if backend == 'cuda' and cupy is None:
+            raise Exception("The cuda backend requires cupy to be installed.")
+        # training features and their squared row norms, see fit
+        self._cache = NormCache()
 
     def __call__(self, alpha, beta):
         """
@@ -63,8 +147,186 @@ class RBF(object):
         """
         alpha, beta = exactly_1d(alpha), exactly_1d(beta)
         distance = np.sum((alpha - beta)**2)
-        amp = -0.5/self.lengthscale**2
-        return self.var_k*np.exp(amp*distance)
+        return self.var_k*np.exp(self._amp*distance)
+
+    def fit(self, x_obs):
+        """
+        Description
+        ----------
+        Caches the training features, cast to the kernel dtype, and their
+        squared row norms so gram matrices against them do not recompute
+        them (see utils.NormCache).
+
+        Parameters
+        ----------
+        x_obs: array_like
+            The (n, d) array of training features.
+
+        Returns
+        ----------
+        None
+        """
+        self._cache.fit(exactly_2d(x_obs), self.dtype)
+
+    def _prepare(self, arr):
+        """
+        Shapes arr with exactly_2d, as Kernel objects do, and casts it to the
+        kernel dtype. Returns it with its squared row norms if arr is the
+        array passed to fit, otherwise with None. Cupy arrays are left on
+        the device.
+        """
+        if cupy is None or cupy.get_array_module(arr) is not cupy:
+            arr = exactly_2d(arr)
+        arr, arr_sq = self._cache.get(arr)
+        if arr_sq is None and self.dtype is not None:
+            arr = arr.astype(self.dtype, copy=False)
+        return arr, arr_sq
+
+    def gram(self, alpha, beta, out=None):
+        """
+        Description
+        ----------
+        Computes the rbf covariance between every row of alpha and every row
+        of beta in one vectorized pass using ||a-b||^2 = a.a + b.b - 2a.b.
+        With the numba backend the arrays are handed to a compiled and
+        threaded loop instead. When alpha is beta the matrix is symmetric
+        and only half of it is computed.
+
+        Parameters
+        ----------
+        alpha: array_like
+            The first (n, d) array to compare. 1D inputs are treated as
+            (n, 1), see utils.exactly_2d.
+        beta: array_like
+            The second (m, d) array to compare.
+        out: array_like
+            An optional preallocated (n, m) float array to write the
+            covariance matrix into. Any float dtype and memory layout is
+            accepted, buffers that are not C contiguous or differ from the
+            dtype of the result are filled through a temporary array.
+
+        Returns
+        ----------
+        A (n, m) array representing the covariance between the rows of
+        alpha and beta.
+        """
+        symmetric = alpha is beta
+        alpha, alpha_sq = self._prepare(alpha)
+        if symmetric:
+            beta, beta_sq = alpha, alpha_sq
+        else:
+            beta, beta_sq = self._prepare(beta)
+        if alpha.shape[1] != beta.shape[1]:
+            raise Exception("Input arrays have differing number of features.")
+        shape = (alpha.shape[0], beta.shape[0])
+        if out is not None and (getattr(out, 'shape', None) != shape or out.dtype.kind != 'f'):
+            raise Exception("Output array must be a float array of shape (n, m).")
+        if self.backend == 'cuda':
+            return self._gram_gpu(alpha, beta, out)
+        if self.backend == 'numba':
+            return self._gram_numba(alpha, beta, out)
+        return self._gram_blocked(alpha, beta, out, alpha_sq, beta_sq)
+
+    def _gram_blocked(self, alpha, beta, out=None, alpha_sq=None, beta_sq=None):
+        """
+        Builds the gram matrix with numpy. Matrices of up to block_size**2
+        entries are built in one pass straight into the output. Larger ones
+        are built in (block_size, block_size) tiles so the matrix product,
+        norms, exp and scaling of each tile are done while the tile is in
+        cache and each tile is written to the output once. When alpha is
+        beta only the upper tiles are computed and then mirrored.
+        """
+        symmetric = alpha is beta
+        alpha = as_float(alpha)
+        beta = alpha if symmetric else as_float(beta)
+        n_len, m_len = alpha.shape[0], beta.shape[0]
+        size = self.block_size
+
+        if alpha_sq is None:
+            alpha_sq = row_norms(alpha)
+        if symmetric:
+            beta_sq = alpha_sq
+        elif beta_sq is None:
+            beta_sq = row_norms(beta)
+
+        dtype = np.result_type(alpha, beta)
+        if out is None:
+            out = np.empty((n_len, m_len), dtype=dtype)
+
+        if n_len*m_len <= size*size:
+            # np.dot only writes into C contiguous buffers of its own dtype
+            if out.dtype == dtype and out.flags.c_contiguous:
+                target = out
+            else:
+                target = np.empty((n_len, m_len), dtype=dtype)
+            _rbf_tile(np, alpha, beta, alpha_sq, beta_sq, self._amp, self.var_k, target)
+            if target is not out:
+                out[...] = target
+        else:
+            # flat buffer so every (possibly ragged) tile view is contiguous
+            buffer = np.empty(size*size, dtype=dtype)
+            for i_0 in range(0, n_len, size):
+                i_1 = min(i_0 + size, n_len)
+                for j_0 in range(i_0 if symmetric else 0, m_len, size):
+                    j_1 = min(j_0 + size, m_len)
+                    tile = buffer[:(i_1 - i_0)*(j_1 - j_0)].reshape(i_1 - i_0, j_1 - j_0)
+                    _rbf_tile(np, alpha[i_0:i_1], beta[j_0:j_1], alpha_sq[i_0:i_1], beta_sq[j_0:j_1],
+                              self._amp, self.var_k, tile)
+                    out[i_0:i_1, j_0:j_1] = tile
+                    if symmetric and j_0 != i_0:
+                        out[j_0:j_1, i_0:i_1] = tile.T
+        if symmetric:
+            np.fill_diagonal(out, self.var_k)
+        return out
+
+    def _gram_numba(self, alpha, beta, out=None):
+        """
+        Builds the gram matrix with the compiled helpers. When alpha is beta
+        only the upper triangle is computed and then mirrored.
+        """
+        symmetric = alpha is beta
+        alpha = as_float(alpha)
+        beta = alpha if symmetric else as_float(beta)
+        # out was checked in gram, the compiled loops do not bounds check
+        if out is None:
+            out = np.empty((alpha.shape[0], beta.shape[0]), dtype=np.result_type(alpha, beta))
+        compiled = _compiled_helpers()
+        if symmetric:
+            return compiled.rbf_gram_sym(alpha, self._amp, self.var_k, out)
+        return compiled.rbf_gram(alpha, beta, self._amp, self.var_k, out)
+
+    def _gram_gpu(self, alpha, beta, out=None):
+        """
+        Builds the gram matrix on the gpu with cupy, using the same tile
+        routine as the numpy path. Numpy inputs are copied to the device once
+        and the result is copied back. Cupy arrays passed to gram directly
+        stay on the device (Kernel objects convert their inputs to numpy
+        first). A cupy out is written on the device and a numpy out receives
+        the copied back result.
+        """
+        on_device = cupy.get_array_module(alpha) is cupy
+        symmetric = alpha is beta
+        alpha = cupy.asarray(alpha, dtype=np.result_type(alpha.dtype, np.float32))
+        beta = alpha if symmetric else cupy.asarray(beta, dtype=np.result_type(beta.dtype, np.float32))
+        shape = (alpha.shape[0], beta.shape[0])
+
+        alpha_sq = row_norms(alpha, cupy)
+        beta_sq = alpha_sq if symmetric else row_norms(beta, cupy)
+        if out is not None and cupy.get_array_module(out) is cupy:
+            cov = out
+        else:
+            cov = cupy.empty(shape, dtype=np.result_type(alpha.dtype, beta.dtype))
+        _rbf_tile(cupy, alpha, beta, alpha_sq, beta_sq, self._amp, self.var_k, cov)
+        if symmetric:
+            cupy.fill_diagonal(cov, self.var_k)
+        if cov is out:
+            return out
+        if out is not None:
+            out[...] = cupy.asnumpy(cov)
+            return out
+        if on_device:
+            return cov
+        return cupy.asnumpy(cov)
 
 # ---------------------------------------------------------------------------------------------------------------------
 # Linear Kernel
@@ -4,7 +4,7 @@ gaussian process modeling.
 """
 
 import numpy as np
-from squidward.utils import array_equal, exactly_2d
+from squidward.utils import array_equal, exactly_2d, exactly_2d_pair
 
 np.seterr(over="raise")
 
@@ -23,7 +23,9 @@ class Kernel(object):
         ----------
         distance_function : Function
             A function that takes in two vectors and returns a float
-            representing the distance between them.
+            representing the distance between them. If the function also
+            exposes a gram(alpha, beta) method it is used to build the full
+            covariance matrix in a single call.
         method: String
             The method used for iterating over the input vectors to arrive
             at the covariance matrix.
@@ -56,9 +58,22 @@ class Kernel(object):
         beta: array-like
             The second array to compare. Must match dimensions for alpha.
         """
-        alpha, beta = exactly_2d(alpha), exactly_2d(beta)
+        alpha, beta = exactly_2d_pair(alpha, beta)
+        # distance functions that can build the whole covariance matrix at
+        # once skip the python level loops in _k1 / _k2
+        if hasattr(self.distance_function, 'gram'):
+            return self.distance_function.gram(alpha, beta)
         return self._k(alpha, beta)
 
+    def fit(self, x_obs):
+        """
+        Lets the distance function cache anything it can about the training
+        features, if it supports it (see RBF.fit).
+        """
+        if hasattr(self.distance_function, 'fit'):
+            # same input handling as __call__, so a fitted array is matched
+            self.distance_function.fit(exactly_2d(x_obs))
+
     def _k1(self, alpha, beta):
         """
         Implementation inspired by scipy.spacial.distance cdist v1.2.0
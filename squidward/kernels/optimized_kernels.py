@@ -5,7 +5,8 @@ than the more general kernel format of Kernel_Base + Distance_Function.
 
 import numpy as np
 
-from squidward.utils import exactly_2d
+from squidward.utils import exactly_2d, exactly_2d_pair, pairwise, NormCache
+from squidward.kernels.distance import LengthscaleMixin
 
 # TODO: Better docstrings
 
@@ -14,7 +15,7 @@ from squidward.utils import exactly_2d
 # ---------------------------------------------------------------------------------------------------------------------
 
 
-class RBF_Kernel(object):
+class RBF_Kernel(LengthscaleMixin):
     """Radial Basis Function Kernel"""
 
     def __init__(self, lengthscale, var_k):
@@ -38,10 +39,27 @@ class RBF_Kernel(object):
         """
         self.lengthscale = lengthscale
         self.var_k = var_k
-        if lengthscale <= 0.0:
-            raise Exception("Lengthscale parameter must be greater than zero.")
         if var_k <= 0.0:
             raise Exception("Kernel variance parameter must be greater than zero.")
+        self._cache = NormCache()
+
+    def fit(self, x_obs):
+        """
+        Description
+        ----------
+        Caches the squared row norms of the training features so kernel
+        calls against them do not recompute them (see utils.NormCache).
+
+        Parameters
+        ----------
+        x_obs: array_like
+            The (n, d) array of training features.
+
+        Returns
+        ----------
+        None
+        """
+        self._cache.fit(exactly_2d(x_obs))
 
     def __call__(self, alpha, beta):
         """
@@ -61,12 +79,14 @@ class RBF_Kernel(object):
         A array representing the covariance between points in
         the vectors alpha and beta.
         """
-        alpha, beta = exactly_2d(alpha), exactly_2d(beta)
-        if alpha.shape[1] != beta.shape[1]:
-            raise Exception("Input arrays have differing number of features.")
-        distance = np.sum(alpha**2, 1).reshape(-1, 1) + np.sum(beta**2, 1) - 2*np.dot(alpha, beta.T)
-        gamma = -0.5/self.lengthscale**2
-        return self.var_k*np.exp(gamma * distance)
+        alpha, beta = exactly_2d_pair(alpha, beta)
+        alpha, alpha_sq = self._cache.get(alpha)
+        beta, beta_sq = self._cache.get(beta)
+        cov = pairwise(alpha, beta, alpha_sq=alpha_sq, beta_sq=beta_sq)
+        np.multiply(cov, self._amp, out=cov)
+        np.exp(cov, out=cov)
+        np.multiply(cov, self.var_k, out=cov)
+        return cov
 
 # ---------------------------------------------------------------------------------------------------------------------
 # A different kernel
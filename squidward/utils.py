@@ -8,6 +8,8 @@ import warnings
 import functools
 import numpy as np
 import scipy.linalg as la
+from scipy.spatial.distance import cdist
+from scipy.special import expit
 
 try:
     # python 2
@@ -48,12 +50,14 @@ def exactly_1d(arr):
             return np.array([arr])
         else:
             raise Exception("Not appropriate input type.")
-    if len(arr.shape) == 1:
+    ndim = arr.ndim
+    if ndim == 1:
         return arr
-    if len(arr.shape) == 2:
-        if arr.shape[0] == 1:
+    if ndim == 2:
+        rows, cols = arr.shape
+        if rows == 1:
             return arr[0, :]
-        if arr.shape[1] == 1:
+        if cols == 1:
             return arr[:, 0]
     raise Exception("Not appropriate input shape.")
 
@@ -63,28 +67,180 @@ def exactly_2d(arr):
     Function to ensure that an array has a least 2 dimensions. Used to
     formalize output / input dimensions for certain functions.
     """
+    # fast path for the common case of an (n, d) array, subclasses such as
+    # np.matrix still go through asarray
+    if type(arr) is np.ndarray and arr.ndim == 2 and arr.shape[0] != 1:
+        return arr
     arr = np.asarray(arr)
-    if len(arr.shape) == 1:
-        return arr.reshape(-1, 1)
-    if len(arr.shape) == 2:
+    ndim = arr.ndim
+    if ndim == 2:
         if arr.shape[0] == 1:
             return arr.reshape(-1, 1)
         return arr
-    if len(arr.shape) == 3:
+    if ndim == 1:
+        return arr.reshape(-1, 1)
+    if ndim == 3:
         if arr.shape[0] == 1:
             return arr[0, :, :]
         if arr.shape[2] == 1:
             return arr[:, :, 0]
-        raise Exception("Not appropriate input shape.")
-    if len(arr.shape) > 3:
-        raise Exception("Not appropriate input shape.")
     raise Exception("Not appropriate input shape.")
 
+
+def exactly_2d_pair(alpha, beta):
+    """
+    Function to apply exactly_2d to a pair of arrays. When alpha is beta
+    the same array is returned for both, so symmetric fast paths further
+    down can still tell that an array is compared against itself.
+    """
+    if alpha is beta:
+        alpha = beta = exactly_2d(alpha)
+        return alpha, beta
+    return exactly_2d(alpha), exactly_2d(beta)
+
+
+def as_float(arr):
+    """
+    Function to cast arrays that are not floating point to float64. Floating
+    point arrays are returned as is so float32 inputs stay float32.
+    """
+    if arr.dtype.kind == 'f':
+        return arr
+    return arr.astype(np.float64)
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Pairwise Distances
+# ---------------------------------------------------------------------------------------------------------------------
+
+
+def row_norms(arr, xp=np):
+    """
+    Function to return the squared norm of every row of a 2D array. xp is
+    the array module (numpy or cupy) the array belongs to.
+    """
+    return xp.einsum('ij,ij->i', arr, arr)
+
+
+def squared_distances(alpha, beta, alpha_sq, beta_sq, out=None, xp=np):
+    """
+    Function to compute ||a-b||^2 = a.a + b.b - 2a.b between every row of
+    the float arrays alpha and beta, given their squared row norms. Every
+    step after the matrix product is done in place, in out if given. xp is
+    the array module (numpy or cupy) the arrays belong to.
+    """
+    distance = xp.dot(alpha, beta.T, out=out)
+    distance *= -2.0
+    distance += alpha_sq[:, None]
+    distance += beta_sq[None, :]
+    # floating point cancellation can leave tiny negative distances
+    xp.maximum(distance, 0.0, out=distance)
+    return distance
+
+
+def pairwise(alpha, beta, metric='sqeuclidean', out=None, alpha_sq=None, beta_sq=None):
+    """
+    Function to return the matrix of distances between every row of alpha
+    and every row of beta. Squared euclidean and euclidean distances are
+    computed as a.a + b.b - 2a.b so the work is done by a single matrix
+    product. All other metrics are passed to scipy cdist. If out is given
+    the distances are written into it instead of a new array. Precomputed
+    squared row norms of alpha / beta can be passed as alpha_sq / beta_sq.
+    """
+    if alpha.shape[1] != beta.shape[1]:
+        raise Exception("Input arrays have differing number of features.")
+    if metric not in ('sqeuclidean', 'euclidean'):
+        if out is None:
+            return cdist(alpha, beta, metric=metric)
+        return cdist(alpha, beta, metric=metric, out=out)
+    symmetric = alpha is beta
+    alpha = as_float(alpha)
+    beta = alpha if symmetric else as_float(beta)
+    if alpha_sq is None:
+        alpha_sq = row_norms(alpha)
+    if symmetric:
+        # symmetric case, reuse the norms (numpy also uses syrk for a.a^T)
+        beta_sq = alpha_sq
+    elif beta_sq is None:
+        beta_sq = row_norms(beta)
+    distance = squared_distances(alpha, beta, alpha_sq, beta_sq, out=out)
+    if symmetric:
+        np.fill_diagonal(distance, 0.0)
+    if metric == 'euclidean':
+        np.sqrt(distance, out=distance)
+    return distance
+
+
+class NormCache(object):
+    """Cache an array with its squared row norms."""
+    def __init__(self):
+        """
+        Description
+        ----------
+        Class to cache the training features of a kernel together with their
+        squared row norms, so covariance matrices against them (on every
+        posterior prediction) do not recompute the norms. The cache is used
+        whenever the fitted array itself (not a copy) is looked up, so it
+        should not be modified in place.
+        """
+        self.arr = self.cast = self.sq = None
+
+    def fit(self, arr, dtype=None):
+        """
+        Caches arr, arr cast to dtype (or to float if dtype is None) and the
+        squared row norms of the cast array.
+        """
+        self.arr = arr
+        if dtype is None:
+            self.cast = as_float(arr)
+        else:
+            self.cast = arr.astype(dtype, copy=False)
+        self.sq = row_norms(self.cast)
+
+    def get(self, arr):
+        """
+        Returns the cast array and its squared row norms if arr is the fitted
+        array, otherwise arr unchanged and None.
+        """
+        if self.arr is not None and arr is self.arr:
+            return self.cast, self.sq
+        return arr, None
+
 # ---------------------------------------------------------------------------------------------------------------------
 # Inversions
 # ---------------------------------------------------------------------------------------------------------------------
 
 
+def _quiet_lu_factor(arr):
+    """
+    Function to LU factor a matrix without scipy's exactly singular warning,
+    for condition estimates that report singularity through rcond.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', la.LinAlgWarning)
+        return la.lu_factor(arr)
+
+
+def rcond_estimate(arr, lu=None, cho=None):
+    """
+    Function to estimate the reciprocal condition number (1-norm) of a
+    matrix with LAPACK gecon / pocon. Pass the output of scipy lu_factor as
+    lu, or of Invert.cho_factor as cho, to reuse a factorization. The
+    estimate itself is O(n^2), the SVD behind np.linalg.cond is O(n^3).
+    """
+    anorm = np.linalg.norm(arr, 1)
+    if cho is not None:
+        factor, lower = cho
+        pocon, = la.get_lapack_funcs(('pocon',), (factor,))
+        rcond, _ = pocon(factor, anorm, uplo='L' if lower else 'U')
+        return rcond
+    if lu is None:
+        lu = _quiet_lu_factor(arr)
+    factor, _ = lu
+    gecon, = la.get_lapack_funcs(('gecon',), (factor,))
+    rcond, _ = gecon(factor, anorm)
+    return rcond
+
+
 def is_invertible(arr, strength='condition'):
     """
     Function to return True is matrix is safely invertible and
@@ -94,6 +250,15 @@ def is_invertible(arr, strength='condition'):
         return np.linalg.det(arr) == 0.0
     if strength == 'rank':
         return arr.shape[0] == arr.shape[1] and np.linalg.matrix_rank(arr) == arr.shape[0]
+    if strength == 'estimate':
+        return rcond_estimate(arr) >= sys.float_info.epsilon
+    if strength == 'cholesky':
+        # a failed cholesky means the matrix is not positive definite
+        try:
+            factor = la.cho_factor(arr, lower=True)
+        except np.linalg.LinAlgError:
+            return False
+        return rcond_estimate(arr, cho=factor) >= sys.float_info.epsilon
     return 1.0 / np.linalg.cond(arr) >= sys.float_info.epsilon
 
 
@@ -103,16 +268,21 @@ def check_valid_cov(cov, safe=True):
     """
     if not safe:
         return None
-    if not is_invertible(cov):
-        warnings.warn('Cov has high condition. Inverting matrix may result in errors.')
-    var = np.diag(cov)
-    if var[var < 0].shape[0] != 0:
+    try:
+        factor = la.cho_factor(cov, lower=True)
+    except np.linalg.LinAlgError:
+        warnings.warn('Cov is not positive definite. Inverting matrix may result in errors.')
+    else:
+        if rcond_estimate(cov, cho=factor) < sys.float_info.epsilon:
+            warnings.warn('Cov has high condition. Inverting matrix may result in errors.')
+    # np.diagonal returns a view, np.diag would copy
+    if (np.diagonal(cov) < 0).any():
         raise Exception('Negative values in diagonal of covariance matrix.\nLikely cause is kernel inversion instability.\nCheck kernel variance.')
 
 
 class Invert(object):
     """Invert matrices."""
-    def __init__(self, method='inv'):
+    def __init__(self, method='inv', dtype=None):
         """
         Description
         ----------
@@ -122,8 +292,17 @@ class Invert(object):
         ----------
         method: String
             The name of the method to be used for inverting matrices.
-            Options: inv, pinv, solve, cholesky, svd, lu, mp_lu
+            Options: inv, pinv, solve, cholesky, svd, lu
+        dtype: numpy dtype
+            Optional dtype that matrices are cast to before inverting. With
+            np.float32 the cholesky method retries in float64 if the float32
+            factorization fails, the inverse is still returned as dtype.
+            Defaults to the dtype of the input.
         """
+        self.dtype = dtype
+        self.method = method
+        # reciprocal condition estimate of the last inverted matrix
+        self.rcond = None
         if method == 'inv':
             self.inv = np.linalg.inv
         elif method == 'pinv':
@@ -136,8 +315,6 @@ class Invert(object):
             self.inv = self.svd
         elif method == 'lu':
             self.inv = self.lu
-        elif method == 'mp_lu':
-            self.inv = self.mp_lu
         else:
             raise Exception('Invalid inversion method argument.')
 
@@ -145,9 +322,33 @@ class Invert(object):
         """
         Inverts matrix.
         """
-        if not is_invertible(arr):
+        if self.dtype is not None:
+            arr = arr.astype(self.dtype, copy=False)
+        # estimate the condition from the factorization the lu and cholesky
+        # methods need anyway, instead of an svd
+        factor = None
+        if self.method == 'lu':
+            # not quieted, scipy's exactly singular warning is worth seeing here
+            factor = la.lu_factor(arr)
+            self.rcond = rcond_estimate(arr, lu=factor)
+        elif self.method == 'cholesky':
+            factor = self.cho_factor(arr)
+            self.rcond = rcond_estimate(arr, cho=factor)
+        elif arr.shape[0] == arr.shape[1]:
+            self.rcond = rcond_estimate(arr)
+        else:
+            # gecon needs a square matrix, pinv and svd also take rectangular ones
+            self.rcond = 1.0 / np.linalg.cond(arr)
+        if self.rcond < sys.float_info.epsilon:
             warnings.warn('Matrix has high condition. Inverting matrix may result in errors.')
-        return self.inv(arr)
+        if factor is None:
+            inverse = self.inv(arr)
+        else:
+            inverse = self.inv(arr, factor)
+        # the cholesky retry may have worked in float64
+        if self.dtype is not None:
+            inverse = inverse.astype(self.dtype, copy=False)
+        return inverse
 
     def solve(self, arr):
         """
@@ -156,47 +357,111 @@ class Invert(object):
         identity = np.identity(arr.shape[-1], dtype=arr.dtype)
         return np.linalg.solve(arr, identity)
 
-    def cholesky(self, arr):
+    def cholesky(self, arr, factor=None):
         """
         Use cholesky decomposition for finding matrix inversion.
         """
-        inv_cholesky = np.linalg.inv(np.linalg.cholesky(arr))
-        return np.dot(inv_cholesky.T, inv_cholesky)
+        if factor is None:
+            factor = self.cho_factor(arr)
+        identity = np.identity(arr.shape[-1], dtype=arr.dtype)
+        return self.cho_solve_rhs(factor, identity)
+
+    def cho_factor(self, arr, max_tries=4):
+        """
+        Return the lower cholesky factor of a matrix. Pass the factor to
+        cho_solve_rhs to solve against the matrix without inverting it.
+
+        Matrices that are only marginally non positive definite (usually from
+        floating point noise) are retried in float64 and then with a jitter
+        added to the diagonal. The jitter starts at 1e-6 times the mean of
+        the diagonal and grows by a factor of ten for up to max_tries tries,
+        so by default it never exceeds 1e-3 times the mean of the diagonal.
+        Matrices that are genuinely indefinite still raise LinAlgError.
+        """
+        try:
+            return la.cho_factor(arr, lower=True)
+        except np.linalg.LinAlgError:
+            pass
+        if arr.dtype == np.float32:
+            arr = arr.astype(np.float64)
+            try:
+                return la.cho_factor(arr, lower=True)
+            except np.linalg.LinAlgError:
+                pass
+        jitter = 1e-6 * np.trace(arr) / arr.shape[0]
+        if jitter > 0.0:
+            diag = np.diag_indices_from(arr)
+            jittered = np.array(arr, dtype=np.float64)
+            for _ in range(max_tries):
+                jittered[diag] = arr[diag] + jitter
+                try:
+                    factor = la.cho_factor(jittered, lower=True)
+                except np.linalg.LinAlgError:
+                    jitter *= 10.0
+                    continue
+                warnings.warn('Matrix is not positive definite. Added {} to the diagonal.'.format(jitter))
+                return factor
+        raise np.linalg.LinAlgError('Matrix is not positive definite, even after adding jitter to the diagonal.')
+
+    def cho_solve_rhs(self, factor, rhs):
+        """
+        Solve arr x = rhs using a factor returned by cho_factor.
+        """
+        return la.cho_solve(factor, rhs)
 
     def svd(self, arr):
         """
         Use singular value decomposition for finidng matrix inversion.
+        Singular values below max(s) * n * eps are treated as zero, which
+        gives the Moore-Penrose inverse for (near) singular matrices.
         """
-        unitary_u, singular_values, unitary_v = np.linalg.svd(arr)
-        return np.dot(unitary_v.T, np.dot(np.diag(singular_values**-1), unitary_u.T))
-
-    def lu(self, arr):
+        unitary_u, singular_values, unitary_v = np.linalg.svd(arr, full_matrices=False)
+        tol = singular_values.max() * max(arr.shape) * np.finfo(singular_values.dtype).eps
+        inv_values = np.zeros_like(singular_values)
+        np.divide(1.0, singular_values, out=inv_values, where=singular_values > tol)
+        # scale the columns of V by 1/s rather than multiplying by diag(1/s)
+        return np.dot(unitary_v.T * inv_values, unitary_u.T)
+
+    def lu(self, arr, factor=None):
         """
         Use lower upper decomposition for finding amtrix inversion.
         """
-        permutation, lower, upper = la.lu(arr)
-        inv_u = np.linalg.inv(upper)
-        inv_l = np.linalg.inv(lower)
-        inv_p = np.linalg.inv(permutation)
-        return inv_u.dot(inv_l).dot(inv_p)
+        if factor is None:
+            factor = la.lu_factor(arr)
+        # lu_solve would divide by the zero pivot and return infs
+        if np.any(np.diag(factor[0]) == 0):
+            raise np.linalg.LinAlgError('Singular matrix')
+        identity = np.identity(arr.shape[-1], dtype=arr.dtype)
+        return la.lu_solve(factor, identity)
 
 # ---------------------------------------------------------------------------------------------------------------------
 # Pre-processing
 # ---------------------------------------------------------------------------------------------------------------------
 
 
-def onehot(arr, num_classes=None, safe=True):
+def onehot(arr, num_classes=None, safe=True, dtype=np.float32):
     """
     Function to take in a 1D label array and returns the one hot encoded
-    transformation.
+    transformation. The ones are scattered straight into an (n, k) array
+    so no (k, k) identity is built.
     """
     arr = exactly_1d(arr)
+    if arr.shape[0]:
+        # casting straight to intp would truncate floats and wrap negatives
+        if arr.dtype.kind not in 'iu':
+            raise Exception('Labels must be integers.')
+        if arr.min() < 0:
+            raise Exception('Labels must be non-negative.')
+    arr = arr.astype(np.intp, copy=False)
     if num_classes is None:
-        num_classes = np.unique(arr).shape[0]
+        # max of an empty array raises, no labels means no classes
+        num_classes = int(arr.max()) + 1 if arr.shape[0] else 0
     if safe:
         if num_classes != np.unique(arr).shape[0]:
             raise Exception('Number of unique values does not match num_classes argument.')
-    return np.squeeze(np.eye(num_classes)[arr.reshape(-1)])
+    encoded = np.zeros((arr.shape[0], num_classes), dtype=dtype)
+    encoded[np.arange(arr.shape[0]), arr] = 1
+    return np.squeeze(encoded)
 
 def reversehot(arr):
     """
@@ -221,13 +486,8 @@ def sigmoid(z):
     Function to return the sigmoid transformation for every
     term in an array.
     """
-    # TODO: find a better way to get this working
-    np.seterr(over="warn")
-    sig = 1.0 / (1.0 + np.exp(-z))
-    sig = np.minimum(sig, 1.0)  # Set upper bound
-    sig = np.maximum(sig, 0.0)  # Set lower bound
-    np.seterr(over="raise")
-    return sig
+    # expit handles overflow for large |z| without touching np.seterr
+    return expit(z)
 
 
 def softmax(z):
@@ -235,8 +495,14 @@ def softmax(z):
     Function to return the softmax transformation over an
     input vector.
     """
-    z = sigmoid(z)
-    return z / z.sum(axis=1).reshape(-1, 1)
+    z = np.asarray(z)
+    if z.dtype.kind != 'f':
+        z = z.astype(np.float64)
+    # shift by the row max so exp never overflows
+    prob = z - z.max(axis=1, keepdims=True)
+    np.exp(prob, out=prob)
+    prob /= prob.sum(axis=1, keepdims=True)
+    return prob
 
 # ---------------------------------------------------------------------------------------------------------------------
 # Miscellaneous
@@ -89,11 +89,11 @@ class GaussianProcessTestCase(ClassificationTestCase):
         npt.assert_almost_equal(logits.round(5), true.round(5), decimal=5)
 
         pred = model.prior_sample(x_train)
-        true = np.array([[0.12480529, 0.1621448 , 0.14280534, 0.17604659, 0.09865555, 0.16052879, 0.13501364],
-                         [0.10440005, 0.17551207, 0.15464492, 0.16258954, 0.0939536 , 0.15516955, 0.15373026],
-                         [0.11712154, 0.18670788, 0.13810118, 0.1712029 , 0.09498927, 0.15366876, 0.13820848],
-                         [0.10031737, 0.18469903, 0.14504828, 0.16995779, 0.09271834, 0.16213637, 0.14512282],
-                         [0.10744391, 0.17595646, 0.14663246, 0.17046057, 0.09386693, 0.16097019, 0.14466948]])
+        true = np.array([[0.09569543, 0.18253163, 0.12938655, 0.24001728, 0.06183578, 0.17712354, 0.11340979],
+                         [0.06426593, 0.23775613, 0.15491167, 0.18080351, 0.05354400, 0.15646202, 0.15225673],
+                         [0.08175399, 0.27883631, 0.11483854, 0.20390801, 0.05670022, 0.14892261, 0.11504031],
+                         [0.05769156, 0.27589808, 0.12376555, 0.19848632, 0.05052321, 0.16970622, 0.12392905],
+                         [0.06813989, 0.23478028, 0.13287100, 0.20894380, 0.05392265, 0.17300684, 0.12833554]])
 
         npt.assert_almost_equal(pred, true, decimal=5)
 
@@ -128,11 +128,11 @@ class GaussianProcessTestCase(ClassificationTestCase):
         npt.assert_almost_equal(logits, true, decimal=5)
 
         pred = model.prior_sample(x_train)
-        true = np.array([[0.04333675, 0.05466259, 0.13162566, 0.14371535, 0.2093348 , 0.27678021, 0.14054465],
-                         [0.049477  , 0.04579106, 0.11176354, 0.17622607, 0.22958224, 0.26035738, 0.12680271],
-                         [0.05382519, 0.06096332, 0.12594534, 0.15892353, 0.20749928, 0.25980799, 0.13303535],
-                         [0.0525714 , 0.05436961, 0.11911843, 0.16516277, 0.19969524, 0.27478564, 0.1342969 ],
-                         [0.05071181, 0.05142889, 0.12369409, 0.15913456, 0.21148355, 0.27230541, 0.13124169]])
+        true = np.array([[0.02319116, 0.03021524, 0.09372914, 0.10719157, 0.21025821, 0.43187584, 0.10353883],
+                         [0.02726003, 0.02496371, 0.07506876, 0.15307586, 0.26333852, 0.36636578, 0.08992735],
+                         [0.02990776, 0.03463809, 0.09005037, 0.13077958, 0.21956503, 0.39717995, 0.09787922],
+                         [0.02930354, 0.03046448, 0.08224208, 0.13658433, 0.19390197, 0.42944458, 0.09805901],
+                         [0.02822101, 0.02867895, 0.08702139, 0.12843141, 0.21809155, 0.41463085, 0.09492483]])
 
         npt.assert_almost_equal(pred, true, decimal=5)
 
@@ -175,11 +175,11 @@ class GaussianProcessTestCase(ClassificationTestCase):
         npt.assert_almost_equal(logits_var, true, decimal=5)
 
         pred = model.posterior_predict(x_train)
-        true = np.array([[0.16666684, 0.16666669, 0.16666684, 0.16666654, 0.16666654, 0.16666654],
-                         [0.16666684, 0.16666669, 0.16666684, 0.16666654, 0.16666654, 0.16666654],
-                         [0.16666684, 0.16666669, 0.16666684, 0.16666654, 0.16666654, 0.16666654],
-                         [0.16666684, 0.16666669, 0.16666684, 0.16666654, 0.16666654, 0.16666654],
-                         [0.16666684, 0.16666669, 0.16666684, 0.16666654, 0.16666654, 0.16666654]])
+        true = np.array([[0.16666702, 0.16666671, 0.16666702, 0.16666642, 0.16666642, 0.16666642],
+                         [0.16666701, 0.16666672, 0.16666701, 0.16666642, 0.16666642, 0.16666642],
+                         [0.16666701, 0.16666671, 0.16666702, 0.16666642, 0.16666642, 0.16666642],
+                         [0.16666701, 0.16666672, 0.16666702, 0.16666642, 0.16666642, 0.16666642],
+                         [0.16666702, 0.16666672, 0.16666702, 0.16666642, 0.16666642, 0.16666642]])
 
         npt.assert_almost_equal(pred, true, decimal=5)
 
@@ -210,11 +210,11 @@ class GaussianProcessTestCase(ClassificationTestCase):
         npt.assert_almost_equal(logits, true, decimal=5)
 
         pred = model.posterior_sample(x_train)
-        true = np.array([[0.4259497 , 0.41844162, 0.15560868],
-                         [0.40883743, 0.38773097, 0.20343161],
-                         [0.40351694, 0.40441486, 0.19206819],
-                         [0.42116111, 0.36615497, 0.21268391],
-                         [0.42222255, 0.38345229, 0.19432516]])
+        true = np.array([[0.47808847, 0.45122775, 0.07068379],
+                         [0.46403088, 0.40701393, 0.12895519],
+                         [0.44478510, 0.44761399, 0.10760091],
+                         [0.51554281, 0.35445021, 0.13000699],
+                         [0.50227199, 0.38598000, 0.11174801]])
 
         npt.assert_almost_equal(pred, true, decimal=5)
 
@@ -277,6 +277,24 @@ class GaussianProcessInversionTestCase(RegressionTestCase):
         npt.assert_almost_equal(output_mean, expected_mean, decimal=7)
         npt.assert_almost_equal(output_cov, expected_cov, decimal=7)
 
+    def test_3(self):
+        """
+        Single Precision
+        Test that the dtype argument is used when fitting the model and that
+        predictions stay close to the double precision ones.
+        """
+        model = gpr.GaussianProcessInversion(kernel=self.kernel, var_l=1, seed=0)
+        model.fit(self.x_train, self.y_train)
+        expected_mean, expected_cov = model.posterior_predict(self.x_train, True)
+
+        model = gpr.GaussianProcessInversion(kernel=self.kernel, var_l=1, seed=0, dtype=np.float32)
+        assert model.inv.dtype == np.float32
+        model.fit(self.x_train, self.y_train)
+        output_mean, output_cov = model.posterior_predict(self.x_train, True)
+
+        npt.assert_almost_equal(output_mean, expected_mean, decimal=4)
+        npt.assert_almost_equal(output_cov, expected_cov, decimal=4)
+
 # ---------------------------------------------------------------------------------------------------------------------
 # Tests for SOGP Inversion Class
 # ---------------------------------------------------------------------------------------------------------------------
@@ -329,6 +347,51 @@ class GaussianProcessCholeskyTestCase(RegressionTestCase):
         npt.assert_almost_equal(output_mean, expected_mean, decimal=7)
         npt.assert_almost_equal(output_cov, expected_cov, decimal=7)
 
+    def test_3(self):
+        """
+        Single Precision
+        Test that the dtype argument is used when fitting the model and that
+        predictions stay close to the double precision ones.
+        """
+        model = gpr.GaussianProcessCholesky(kernel=self.kernel, var_l=1, seed=0)
+        model.fit(self.x_train, self.y_train)
+        expected_mean, expected_cov = model.posterior_predict(self.x_train, True)
+
+        model = gpr.GaussianProcessCholesky(kernel=self.kernel, var_l=1, seed=0, dtype=np.float32)
+        assert model.inv.dtype == np.float32
+        model.fit(self.x_train, self.y_train)
+        output_mean, output_cov = model.posterior_predict(self.x_train, True)
+
+        npt.assert_almost_equal(output_mean, expected_mean, decimal=4)
+        npt.assert_almost_equal(output_cov, expected_cov, decimal=4)
+
+    def test_4(self):
+        """
+        Cached Training Norms
+        Test that posterior predictions reuse the squared norms of the
+        training features cached at fit time and match a kernel that caches
+        nothing.
+        """
+        x_test = self.x_train[:3] + 0.1
+
+        model = gpr.GaussianProcessCholesky(kernel=self.kernel, var_l=1, seed=0)
+        model.fit(self.x_train, self.y_train)
+        with mock.patch.object(distance, 'row_norms', wraps=distance.row_norms) as mock_norms:
+            output_mean, output_cov = model.posterior_predict(x_test, True)
+        # only the test points are normed
+        assert mock_norms.call_count > 0
+        for call in mock_norms.call_args_list:
+            self.assertEqual(call[0][0].shape[0], x_test.shape[0])
+
+        with mock.patch.object(distance.RBF, 'fit', lambda self, x_obs: None):
+            kernel = kernel_base.Kernel(distance.RBF(3.0, 2.0**2), 'k1')
+            model = gpr.GaussianProcessCholesky(kernel=kernel, var_l=1, seed=0)
+            model.fit(self.x_train, self.y_train)
+            expected_mean, expected_cov = model.posterior_predict(x_test, True)
+
+        npt.assert_almost_equal(output_mean, expected_mean, decimal=10)
+        npt.assert_almost_equal(output_cov, expected_cov, decimal=10)
+
 
 if __name__ == '__main__':
     unittest.main()
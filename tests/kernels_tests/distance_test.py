@@ -1,6 +1,9 @@
 import unittest
+from unittest import mock
 import numpy as np
+import numpy.testing as npt
 
+from squidward import utils
 from squidward.kernels import distance
 
 # useful for debugging
@@ -22,6 +25,11 @@ class DistanceTestCase(unittest.TestCase):
         self.beta = np.array([0.89592768, 0.83254226, 0.67318587, 0.06753976, 0.4851254,
                               0.60731089, 0.29373965, 0.59003959, 0.40602443, 0.34742655])
 
+        # (n, d) arrays for the gram matrix tests
+        random = np.random.RandomState(0)
+        self.alpha_2d = random.normal(0, 1, (6, 3))
+        self.beta_2d = random.normal(0, 1, (4, 3))
+
 
 class RBFTestCase(DistanceTestCase):
     """Tests for radial basis function."""
@@ -43,6 +51,23 @@ class RBFTestCase(DistanceTestCase):
         print( str(context.exception) )
         self.assertTrue('Kernel variance parameter must be greater than zero' in str(context.exception))
 
+        # pass an invalid backend
+        with self.assertRaises(Exception) as context:
+            distance.RBF(12.0, 14.0**2, backend='fake')
+        self.assertTrue('Invalid argument for backend.' in str(context.exception))
+
+        # ask for the numba backend without numba
+        with mock.patch.object(distance, '_compiled_helpers', lambda: None):
+            with self.assertRaises(Exception) as context:
+                distance.RBF(12.0, 14.0**2, backend='numba')
+            self.assertTrue('The numba backend requires numba to be installed.' in str(context.exception))
+
+        # ask for the cuda backend without cupy
+        with mock.patch.object(distance, 'cupy', None):
+            with self.assertRaises(Exception) as context:
+                distance.RBF(12.0, 14.0**2, backend='cuda')
+            self.assertTrue('The cuda backend requires cupy to be installed.' in str(context.exception))
+
     def test_2(self):
         """
         Normal Input
@@ -68,6 +93,211 @@ class RBFTestCase(DistanceTestCase):
             output = d(a, a)
         self.assertTrue('Not appropriate input shape.' in str(context.exception))
 
+    def test_3(self):
+        """
+        Gram Matrix
+        Test that the vectorized gram matrix matches the pairwise distance.
+        """
+        d = distance.RBF(0.5, 2.0 ** 2)
+        a = self.alpha_2d
+        b = self.beta_2d
+
+        true = np.array([[d(a[i], b[j]) for j in range(b.shape[0])] for i in range(a.shape[0])])
+        output = d.gram(a, b)
+        npt.assert_almost_equal(output, true, decimal=10)
+
+        out = np.empty((6, 4))
+        output = d.gram(a, b, out=out)
+        assert output is out
+        npt.assert_almost_equal(output, true, decimal=10)
+
+        # buffers of another float dtype or layout are filled through a temporary
+        for out in [np.empty((6, 4), dtype=np.float32), np.empty((6, 4), order='F')]:
+            output = d.gram(a, b, out=out)
+            assert output is out
+            npt.assert_almost_equal(output, true, decimal=5)
+        out = np.empty((6, 4))
+        output = distance.RBF(0.5, 2.0 ** 2, dtype=np.float32).gram(a, b, out=out)
+        assert output is out
+        npt.assert_almost_equal(output, true, decimal=5)
+
+        for out in [np.empty((4, 6)), np.empty((6, 4), dtype=np.int64), [[0.0]*4]*6]:
+            with self.assertRaises(Exception) as context:
+                d.gram(a, b, out=out)
+            self.assertTrue('Output array must be a float array of shape (n, m).' in str(context.exception))
+
+        # symmetric fast path
+        true = d.gram(a, a.copy())
+        output = d.gram(a, a)
+        npt.assert_almost_equal(output, true, decimal=10)
+        npt.assert_equal(np.diag(output), np.full(6, d.var_k))
+
+        # parameters changed after construction are picked up
+        d.lengthscale = 1.5
+        true = distance.RBF(1.5, 2.0 ** 2).gram(a, b)
+        npt.assert_almost_equal(d.gram(a, b), true, decimal=10)
+        self.assertAlmostEqual(d(a[0], b[0]), true[0, 0], places=10)
+
+        with self.assertRaises(Exception) as context:
+            d.lengthscale = 0.0
+        self.assertTrue('Lengthscale parameter must be greater than zero' in str(context.exception))
+
+        # lists and 1D arrays are shaped like they are for Kernel objects
+        npt.assert_almost_equal(d.gram(a.tolist(), b.tolist()), d.gram(a, b), decimal=10)
+        npt.assert_almost_equal(d.gram(a[:, 0], b[:, 0]), d.gram(a[:, :1], b[:, :1]), decimal=10)
+
+        with self.assertRaises(Exception) as context:
+            d.gram(np.ones((6, 1, 3)), b)
+        self.assertTrue('Not appropriate input shape.' in str(context.exception))
+
+        with self.assertRaises(Exception) as context:
+            d.gram(a, b[:, :2])
+        self.assertTrue('Input arrays have differing number of features.' in str(context.exception))
+
+    @unittest.skipIf(distance._compiled_helpers() is None, "numba is not installed")
+    def test_4(self):
+        """
+        Compiled Gram Matrix
+        Test that the numba gram matrix matches the numpy gram matrix.
+        """
+        d = distance.RBF(0.5, 2.0 ** 2, backend='numba')
+        a = self.alpha_2d
+        b = self.beta_2d
+
+        true = d.var_k*np.exp(-0.5/d.lengthscale**2*utils.pairwise(a, b))
+        output = d.gram(a, b)
+        npt.assert_almost_equal(output, true, decimal=10)
+
+        true = d.var_k*np.exp(-0.5/d.lengthscale**2*utils.pairwise(a, a))
+        output = d.gram(a, a)
+        npt.assert_almost_equal(output, true, decimal=10)
+        npt.assert_equal(np.diag(output), np.full(6, d.var_k))
+
+        out = np.empty((6, 4))
+        output = d.gram(a, b, out=out)
+        assert output is out
+        npt.assert_almost_equal(output, d.var_k*np.exp(-0.5/d.lengthscale**2*utils.pairwise(a, b)), decimal=10)
+
+        with self.assertRaises(Exception) as context:
+            d.gram(a, b[:, :2])
+        self.assertTrue('Input arrays have differing number of features.' in str(context.exception))
+
+        # buffers the compiled loop would write past or cannot hold floats
+        for out in [np.empty((4, 6)), np.empty((2, 2)), np.empty((6, 4), dtype=np.int64), [[0.0]*4]*6]:
+            with self.assertRaises(Exception) as context:
+                d.gram(a, b, out=out)
+            self.assertTrue('Output array must be a float array of shape (n, m).' in str(context.exception))
+
+    def test_5(self):
+        """
+        Tiled Gram Matrix
+        Test that the tiled numpy gram matrix matches the untiled one,
+        including ragged tiles and integer inputs.
+        """
+        d = distance.RBF(0.5, 2.0 ** 2)
+        a = self.alpha_2d
+        b = self.beta_2d
+
+        true_ab = d.gram(a, b)
+        true_aa = d.gram(a, a)
+        true_int = d.gram(np.arange(6).reshape(-1, 1), np.arange(4).reshape(-1, 1))
+
+        d.block_size = 4
+        output = d.gram(a, b)
+        npt.assert_almost_equal(output, true_ab, decimal=10)
+
+        output = d.gram(a, a)
+        npt.assert_almost_equal(output, true_aa, decimal=10)
+        npt.assert_equal(np.diag(output), np.full(6, d.var_k))
+
+        output = d.gram(np.arange(6).reshape(-1, 1), np.arange(4).reshape(-1, 1))
+        npt.assert_almost_equal(output, true_int, decimal=10)
+
+        out = np.empty((6, 4), dtype=np.float32)
+        output = d.gram(a, b, out=out)
+        assert output is out
+        npt.assert_almost_equal(output, true_ab, decimal=5)
+
+        # a buffer with a spare column would be left partly uninitialised
+        with self.assertRaises(Exception) as context:
+            d.gram(a, b, out=np.empty((6, 5)))
+        self.assertTrue('Output array must be a float array of shape (n, m).' in str(context.exception))
+
+    def test_6(self):
+        """
+        Single Precision Gram Matrix
+        Test that the dtype argument casts gram matrices to float32.
+        """
+        a = self.alpha_2d
+        b = self.beta_2d
+
+        double = distance.RBF(0.5, 2.0 ** 2)
+        single = distance.RBF(0.5, 2.0 ** 2, dtype=np.float32)
+
+        true_ab, true_aa = double.gram(a, b), double.gram(a, a)
+
+        output = single.gram(a, b)
+        assert output.dtype == np.float32
+        npt.assert_almost_equal(output, true_ab, decimal=5)
+
+        output = single.gram(a, a)
+        assert output.dtype == np.float32
+        npt.assert_almost_equal(output, true_aa, decimal=5)
+
+    def test_7(self):
+        """
+        Fitted Gram Matrix
+        Test that caching the training features in fit does not change the
+        gram matrix.
+        """
+        a = self.alpha_2d
+        b = self.beta_2d
+
+        for dtype in [None, np.float32]:
+            d = distance.RBF(0.5, 2.0 ** 2, dtype=dtype)
+            true_ab, true_ba, true_aa = d.gram(a, b), d.gram(b, a), d.gram(a, a)
+
+            d.fit(a)
+            npt.assert_almost_equal(d._cache.sq, np.einsum('ij,ij->i', a, a), decimal=5)
+            npt.assert_almost_equal(d.gram(a, b), true_ab, decimal=6)
+            npt.assert_almost_equal(d.gram(b, a), true_ba, decimal=6)
+            npt.assert_almost_equal(d.gram(a, a), true_aa, decimal=6)
+
+            d.block_size = 4
+            npt.assert_almost_equal(d.gram(a, b), true_ab, decimal=6)
+            npt.assert_almost_equal(d.gram(a, a), true_aa, decimal=6)
+
+    @unittest.skipIf(distance.cupy is None, "cupy is not installed")
+    def test_8(self):
+        """
+        GPU Gram Matrix
+        Test that the cuda gram matrix matches the cpu gram matrix.
+        """
+        a = self.alpha_2d
+        b = self.beta_2d
+
+        cpu = distance.RBF(0.5, 2.0 ** 2)
+        gpu = distance.RBF(0.5, 2.0 ** 2, backend='cuda')
+
+        npt.assert_almost_equal(gpu.gram(a, b), cpu.gram(a, b), decimal=10)
+        npt.assert_almost_equal(gpu.gram(a, a), cpu.gram(a, a), decimal=10)
+
+        out = np.empty((6, 4))
+        output = gpu.gram(a, b, out=out)
+        assert output is out
+        npt.assert_almost_equal(output, cpu.gram(a, b), decimal=10)
+
+        # cupy inputs and outputs stay on the device
+        cupy = distance.cupy
+        out = cupy.empty((6, 4))
+        output = gpu.gram(cupy.asarray(a), cupy.asarray(b), out=out)
+        assert output is out
+        npt.assert_almost_equal(cupy.asnumpy(output), cpu.gram(a, b), decimal=10)
+
+        with self.assertRaises(Exception) as context:
+            gpu.gram(a, b, out=np.empty((4, 6)))
+        self.assertTrue('Output array must be a float array of shape (n, m).' in str(context.exception))
+
 
 if __name__ == '__main__':
     unittest.main()
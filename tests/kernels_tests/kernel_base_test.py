@@ -1,8 +1,9 @@
 import unittest
+from unittest import mock
 import numpy as np
 import numpy.testing as npt
 
-from squidward.kernels import kernel_base
+from squidward.kernels import kernel_base, distance
 
 # useful for debugging
 np.set_printoptions(suppress=True)
@@ -111,6 +112,34 @@ class KernelTestCase(unittest.TestCase):
 
         npt.assert_almost_equal(output, expected_output, decimal=7)
 
+    def test_4(self):
+        """
+        Fit
+        Test that fitting the kernel forwards the training features to
+        distance functions that support it.
+        """
+        a = self.alpha
+
+        d = distance.RBF(0.5, 2.0)
+        kernel = kernel_base.Kernel(d, 'k1')
+        true = kernel(a, self.beta)
+
+        # lists and 1D arrays are shaped the same way as in __call__
+        with mock.patch.object(d, 'fit', wraps=d.fit) as mock_fit:
+            kernel.fit(a)
+            assert mock_fit.call_args[0][0] is a
+            kernel.fit(a.tolist())
+            npt.assert_equal(mock_fit.call_args[0][0], a)
+            kernel.fit(a[:, 0])
+            npt.assert_equal(mock_fit.call_args[0][0], a[:, :1])
+
+        kernel.fit(a)
+        npt.assert_almost_equal(kernel(a, self.beta), true, decimal=10)
+
+        # distance functions without fit are left alone
+        kernel = kernel_base.Kernel(self.dist, 'k1')
+        kernel.fit(a)
+
 
 if __name__ == '__main__':
     unittest.main()
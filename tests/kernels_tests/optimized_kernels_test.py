@@ -1,7 +1,9 @@
 import unittest
+from unittest import mock
 import numpy as np
 import numpy.testing as npt
 
+from squidward import utils
 from squidward.kernels import optimized_kernels
 
 # useful for debugging
@@ -70,6 +72,41 @@ class RBFTestCase(OptimizedKernelsTestCase):
 
         npt.assert_almost_equal(output, expected_output, decimal=7)
 
+    def test_3(self):
+        """
+        Parameter Updates
+        Test that changing the lengthscale after construction is used by
+        later kernel calls.
+        """
+        kernel = optimized_kernels.RBF_Kernel(lengthscale=0.5, var_k=2.0)
+        kernel.lengthscale = 1.5
+
+        expected_output = optimized_kernels.RBF_Kernel(lengthscale=1.5, var_k=2.0)(self.alpha, self.beta)
+        output = kernel(self.alpha, self.beta)
+        npt.assert_almost_equal(output, expected_output, decimal=10)
+
+        with self.assertRaises(Exception) as context:
+            kernel.lengthscale = 0.0
+        self.assertTrue("Lengthscale parameter must be greater than zero." in str(context.exception))
+
+    def test_4(self):
+        """
+        Fitted Kernel
+        Test that kernel calls against the fitted features reuse their norms
+        and that caching them does not change the kernel.
+        """
+        kernel = optimized_kernels.RBF_Kernel(lengthscale=0.5, var_k=2.0)
+        true_ab, true_aa = kernel(self.alpha, self.beta), kernel(self.alpha, self.alpha)
+
+        kernel.fit(self.alpha)
+        with mock.patch.object(utils, 'row_norms', wraps=utils.row_norms) as mock_norms:
+            output_ab = kernel(self.alpha, self.beta)
+            output_aa = kernel(self.alpha, self.alpha)
+        # only beta is normed, the fitted alpha comes from the cache
+        self.assertEqual(mock_norms.call_count, 1)
+        npt.assert_almost_equal(output_ab, true_ab, decimal=10)
+        npt.assert_almost_equal(output_aa, true_aa, decimal=10)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -2,6 +2,8 @@ import unittest
 import warnings
 import numpy as np
 import numpy.testing as npt
+import scipy.linalg as la
+from scipy.spatial.distance import cdist
 
 from squidward import utils
 from squidward.utils import deprecated
@@ -83,6 +85,20 @@ class UtilitiesTestCase(unittest.TestCase):
             utils.exactly_2d(x)
         self.assertTrue('Not appropriate input shape.' in str(context.exception))
 
+        # pairs keep an array compared against itself as one array
+        x = np.ones(10)
+        output_a, output_b = utils.exactly_2d_pair(x, x)
+        assert output_a is output_b
+        npt.assert_almost_equal(output_a, np.ones(10).reshape(-1,1), decimal=10)
+        output_a, output_b = utils.exactly_2d_pair(x, x.copy())
+        assert output_a is not output_b
+
+        # subclasses are converted to plain arrays
+        x = np.ma.masked_array(np.ones((10,10)))
+        output = utils.exactly_2d(x)
+        assert type(output) is np.ndarray
+        npt.assert_almost_equal(output, true, decimal=10)
+
     # ---------------------------------------------------------------------------------------------------------------------
     # Inversions
     # ---------------------------------------------------------------------------------------------------------------------
@@ -101,6 +117,21 @@ class UtilitiesTestCase(unittest.TestCase):
         output = utils.is_invertible(arr, 'rank')
         assert output
 
+        output = utils.is_invertible(arr, 'estimate')
+        assert output
+
+        # estimate should agree with the exact condition number to within
+        # an order of magnitude
+        rcond = utils.rcond_estimate(arr)
+        true = 1.0 / np.linalg.cond(arr, 1)
+        assert true / 10.0 <= rcond <= true * 10.0
+        inv = utils.Invert("lu")
+        inv(arr)
+        npt.assert_almost_equal(inv.rcond, rcond, decimal=10)
+        inv = utils.Invert("cholesky")
+        inv(arr)
+        assert true / 10.0 <= inv.rcond <= true * 10.0
+
         # cramer's rule method fails here due to
         # floating point errors in np.linalg.det
         # LU decomposition approximation of determinant
@@ -121,6 +152,9 @@ class UtilitiesTestCase(unittest.TestCase):
         output = utils.is_invertible(arr, 'rank')
         assert ~output
 
+        output = utils.is_invertible(arr, 'estimate')
+        assert not output
+
         output = utils.is_invertible(arr, 'cramer')
         assert ~output
 
@@ -130,11 +164,24 @@ class UtilitiesTestCase(unittest.TestCase):
         Test that the function that validates covariance matricies works.
         """
         x = np.array([[1, 1, 1],[1, 0, 1],[1, 1, 0]])
-        output = output = utils.check_valid_cov(x)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            output = output = utils.check_valid_cov(x)
+            # invertible but not positive definite
+            assert "Cov is not positive definite." in str(w[-1].message)
+        assert output is None
+
+        x = np.array([[2, 1, 0],[1, 2, 1],[0, 1, 2]])
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            output = utils.check_valid_cov(x)
+            assert len(w) == 0
         assert output is None
+        assert utils.is_invertible(x, 'cholesky')
 
         x = np.array([[-1, 1, 1],[1, 0, 1],[1, 1, 0]])
-        with self.assertRaises(Exception) as context:
+        with warnings.catch_warnings(record=True), self.assertRaises(Exception) as context:
+            warnings.simplefilter("always")
             utils.check_valid_cov(x)
         self.assertTrue('Negative values in diagonal of covariance matrix.\nLikely cause is kernel '
                         'inversion instability.\nCheck kernel variance.' in str(context.exception))
@@ -147,6 +194,14 @@ class UtilitiesTestCase(unittest.TestCase):
             warnings.simplefilter("always")
             # Trigger a warning.
             utils.check_valid_cov(arr)
+            assert "Cov is not positive definite. Inverting matrix may result in errors." in str(w[-1].message)
+
+        # pass a positive definite matrix with a high condition
+        arr = np.diag([1.0, 1e-17, 1.0])
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            utils.check_valid_cov(arr)
+            assert len(w) == 1
             assert "Cov has high condition. Inverting matrix may result in errors." in str(w[-1].message)
 
         # TODO: check show_warnings argument actually silences warnings
@@ -188,19 +243,57 @@ class UtilitiesTestCase(unittest.TestCase):
         output = inv(arr)
         npt.assert_almost_equal(output, true, decimal=7)
 
+        inv = utils.Invert("cholesky")
+        factor = inv.cho_factor(arr)
+        output = inv.cho_solve_rhs(factor, np.identity(arr.shape[0]))
+        npt.assert_almost_equal(output, true, decimal=7)
+
+        inv = utils.Invert("cholesky", dtype=np.float32)
+        output = inv(arr)
+        assert output.dtype == np.float32
+        npt.assert_almost_equal(output, true, decimal=3)
+
         inv = utils.Invert("svd")
         output = inv(arr)
         npt.assert_almost_equal(output, true, decimal=7)
 
+        # rectangular matrices have no inverse but pinv and svd still apply
+        rect = np.random.RandomState(0).normal(0, 1, (5, 3))
+        for method in ["pinv", "svd"]:
+            inv = utils.Invert(method)
+            output = inv(rect)
+            npt.assert_almost_equal(output, np.linalg.pinv(rect), decimal=7)
+            assert 0.0 < inv.rcond <= 1.0
+
         inv = utils.Invert("lu")
         output = inv(arr)
         npt.assert_almost_equal(output, true, decimal=7)
 
+        # exactly singular matrices warn and raise instead of returning infs
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            with self.assertRaises(np.linalg.LinAlgError) as context:
+                inv(np.array([[1.0, 2.0], [2.0, 4.0]]))
+            assert any(issubclass(warning.category, la.LinAlgWarning) for warning in w)
+        self.assertTrue('Singular matrix' in str(context.exception))
+
+        # svd truncates tiny singular values and matches pinv on singular input
+        singular = np.random.RandomState(0).rand(10, 10)
+        singular[-1] = singular[0] + singular[1]
+        inv = utils.Invert("svd")
+        output = inv.svd(singular)
+        npt.assert_almost_equal(output, np.linalg.pinv(singular), decimal=7)
+
         # pass an invlaid inversion method
         with self.assertRaises(Exception) as context:
             utils.Invert("fake")
         self.assertTrue('Invalid inversion method argument.' in str(context.exception))
 
+        # multiprocessing lu was removed in favour of lu
+        with self.assertRaises(Exception) as context:
+            utils.Invert("mp_lu")
+        self.assertTrue('Invalid inversion method argument.' in str(context.exception))
+
         # pass a singular matrix and catch warning
 
         arr = np.random.rand(10, 10)
@@ -216,6 +309,45 @@ class UtilitiesTestCase(unittest.TestCase):
             assert len(w) == 1
             assert "Matrix has high condition." in str(w[-1].message)
 
+    def test_13(self):
+        """
+        Cholesky Jitter
+        Test that cholesky inversion recovers from matrices that are only
+        positive semi-definite and fails for matrices that are not.
+        """
+        random = np.random.RandomState(0)
+        x = random.normal(0, 1, (10, 3))
+        # rank 3 matrix so plain cholesky fails
+        arr = x.dot(x.T)
+
+        inv = utils.Invert("cholesky")
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            factor = inv.cho_factor(arr)
+            assert "Matrix is not positive definite. Added" in str(w[-1].message)
+        assert np.all(np.isfinite(factor[0]))
+
+        arr = -np.identity(3)
+        with self.assertRaises(np.linalg.LinAlgError) as context:
+            inv.cho_factor(arr)
+        self.assertTrue('Matrix is not positive definite, even after adding jitter' in str(context.exception))
+
+        # indefinite with a positive trace, eigenvalues 3 and -1
+        arr = np.array([[1.0, 2.0], [2.0, 1.0]])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            with self.assertRaises(np.linalg.LinAlgError) as context:
+                inv(arr)
+        self.assertTrue('Matrix is not positive definite, even after adding jitter' in str(context.exception))
+
+        # the jittered factor is float64 but the inverse keeps the requested dtype
+        arr = x.dot(x.T)
+        inv = utils.Invert("cholesky", dtype=np.float32)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            output = inv(arr)
+        assert output.dtype == np.float32
+
     # ---------------------------------------------------------------------------------------------------------------------
     # Pre-processing
     # ---------------------------------------------------------------------------------------------------------------------
@@ -242,6 +374,25 @@ class UtilitiesTestCase(unittest.TestCase):
 
         output = utils.onehot(y)
         npt.assert_almost_equal(output, true, decimal=10)
+        assert output.dtype == np.float32
+
+        output = utils.onehot(y, 3, dtype=np.uint8)
+        npt.assert_equal(output, true)
+        assert output.dtype == np.uint8
+
+        # empty labels give an empty encoding
+        output = utils.onehot(np.array([], dtype=int), safe=False)
+        npt.assert_equal(output, np.eye(0)[np.array([], dtype=int)])
+        output = utils.onehot(np.array([], dtype=int))
+        assert output.size == 0
+
+        with self.assertRaises(Exception) as context:
+            utils.onehot(np.array([0.7, 1.2, 0.1]), safe=False)
+        self.assertTrue('Labels must be integers.' in str(context.exception))
+
+        with self.assertRaises(Exception) as context:
+            utils.onehot(np.array([-1, 0, -1]), safe=False)
+        self.assertTrue('Labels must be non-negative.' in str(context.exception))
 
         with self.assertRaises(Exception) as context:
             utils.onehot(y,4)
@@ -324,13 +475,17 @@ class UtilitiesTestCase(unittest.TestCase):
         Test softmax function works.
         """
         x = np.array([[-8, 0, 6],[8, 3, 1],[10, -300, 11]])
-        true = np.array([[2.2388575697e-004, 3.3380896059e-001, 6.6596715365e-001],
-                         [3.7255082739e-001, 3.5500132884e-001, 2.7244784376e-001],
-                         [4.9999282567e-001, 2.5741800386e-131, 5.0000717433e-001]])
+        true = np.array([[8.2947197391e-007, 2.4726211057e-003, 9.9752654942e-001],
+                         [9.9240824665e-001, 6.6867941674e-003, 9.0495918259e-004],
+                         [2.6894142137e-001, 6.2859121305e-136, 7.3105857863e-001]])
 
         output = utils.softmax(x)
         npt.assert_almost_equal(output, true, decimal=10)
 
+        # large logits should not overflow
+        output = utils.softmax(x + 1000.0)
+        npt.assert_almost_equal(output, true, decimal=10)
+
     # ---------------------------------------------------------------------------------------------------------------------
     # Miscellaneous
     # ---------------------------------------------------------------------------------------------------------------------
@@ -355,6 +510,37 @@ class UtilitiesTestCase(unittest.TestCase):
             assert issubclass(w[-1].category, DeprecationWarning)
             assert "deprecated" in str(w[-1].message)
 
+    # ---------------------------------------------------------------------------------------------------------------------
+    # Pairwise Distances
+    # ---------------------------------------------------------------------------------------------------------------------
+
+    def test_12(self):
+        """
+        Pairwise
+        Test that pairwise distances match scipy cdist for every metric.
+        """
+        random = np.random.RandomState(0)
+        a = random.normal(0, 1, (6, 3))
+        b = random.normal(0, 1, (4, 3))
+
+        for metric in ['sqeuclidean', 'euclidean', 'cityblock']:
+            output = utils.pairwise(a, b, metric)
+            true = cdist(a, b, metric)
+            npt.assert_almost_equal(output, true, decimal=10)
+
+        output = utils.pairwise(a, a)
+        npt.assert_equal(np.diag(output), np.zeros(6))
+
+        # integer inputs are cast to float before the in place updates
+        ints = np.arange(5).reshape(-1, 1)
+        output = utils.pairwise(ints, ints[:3])
+        true = cdist(ints, ints[:3], 'sqeuclidean')
+        npt.assert_equal(output, true)
+
+        with self.assertRaises(Exception) as context:
+            utils.pairwise(a, b[:, :2])
+        self.assertTrue('Input arrays have differing number of features.' in str(context.exception))
+
 
 if __name__ == '__main__':
     unittest.main()